@@ -1,10 +1,22 @@
 import streamlit as st
-from typing import List, Dict
+from typing import TYPE_CHECKING, Dict, Final, List, Mapping, NamedTuple, Optional, Sequence, Tuple
 import os
-from openai import OpenAI
+import pandas as pd
 from datetime import datetime
+import copy
 import json
-from io import BytesIO
+import re
+import csv
+import sqlite3
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import BytesIO, StringIO
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 # ReportLab imports for PDF generation
 from reportlab.lib.pagesizes import letter, A4
@@ -18,8 +30,8 @@ from reportlab.platypus import (
 from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT, TA_RIGHT
 from reportlab.pdfgen import canvas
 from reportlab.graphics.shapes import Drawing
-from reportlab.graphics.charts.piecharts import Pie
-from reportlab.graphics.charts.barcharts import VerticalBarChart
+# Chart widgets (piecharts/barcharts and their axis/label machinery) are
+# imported where they are drawn, so sessions that never submit skip them
 
 # ---------------- Page Configuration ----------------
 st.set_page_config(
@@ -29,19 +41,361 @@ st.set_page_config(
 )
 
 # ---------------- Initialize Session State ----------------
+def hash_api_key(api_key: str) -> str:
+    """Short digest of the API key, so cache keys never hold the secret itself."""
+    return hashlib.blake2b(api_key.encode(), digest_size=8).hexdigest()
+
 if 'openai_api_key' not in st.session_state:
     st.session_state.openai_api_key = os.getenv('OPENAI_API_KEY', '')
 
+# Finished reports for this session, keyed by report_cache_key (oldest first)
+if 'pdf_cache' not in st.session_state:
+    st.session_state.pdf_cache = OrderedDict()
+
+# ---------------- Assessment Questions ----------------
+
+# Shared answer scales (literal tuples, folded into code-object constants)
+OPT_FREQ: Final[Tuple[str, ...]] = ("Very often", "Sometimes", "Rarely")
+OPT_DESCRIBE: Final[Tuple[str, ...]] = ("Describes my child well", "Describes my child somewhat", "Does not describe my child")
+OPT_USUALLY: Final[Tuple[str, ...]] = ("Usually", "Sometimes", "Rarely")
+OPT_AGREE: Final[Tuple[str, ...]] = ("Strongly agree", "Agree", "Disagree")
+
+class QItem(NamedTuple):
+    """A single assessment question and its answer options"""
+    key: str
+    question: str
+    options: Tuple[str, ...]
+    label: str = ""  # numbered radio label, filled in by _build_questions
+
+@st.cache_resource(show_spinner=False)
+def _build_questions() -> Tuple[QItem, ...]:
+    """Build the 30-question catalog once per process rather than on every rerun"""
+    questions = (
+        # Dimension 1: Learning Style Preferences (per-question visual/auditory/kinesthetic options)
+        QItem("q1", "My child tends to remember things best after...",
+            ("Seeing them written down or in a picture", "Hearing them spoken aloud", "Doing a physical activity associated with them")),
+        QItem("q2", "When assembling a new toy, they are most likely to...",
+            ("Look carefully at the diagrams in the manual", "Ask someone to read the instructions to them", "Ignore the instructions and figure it out by handling the pieces")),
+        QItem("q3", "Express themselves and their ideas through...",
+            ("Drawing, doodling, or making visual aids", "Talking, telling stories, or singing songs", "Gesturing, acting things out, or building models")),
+        QItem("q4", "When spelling a new word, they often...",
+            ("Try to visualize what the word looks like", "Sound out the letters phonetically", "Write it down or trace the letters with their finger")),
+        QItem("q5", "Most distracted in classroom by...",
+            ("Messy or cluttered visual surroundings", "Noises and other people talking", "Having to sit still for long periods")),
+        QItem("q6", "Enjoy books that have...",
+            ("Lots of detailed illustrations or photographs", "A captivating narrator or read aloud with expression", "Interactive elements like flaps or textures to feel")),
+        # Dimension 2: Developmental Orientation Profile
+        QItem("q7", "When faced with a group project, my child organizes the plan and makes sure everyone knows their role.", OPT_FREQ),
+        QItem("q8", "Comes up with imaginative and original ideas for the project.", OPT_FREQ),
+        QItem("q9", "Focuses on making sure everyone feels included and is working together happily.", OPT_FREQ),
+        QItem("q10", "Is eager to start building or making the physical parts of the project.", OPT_FREQ),
+        QItem("q11", "Enjoys improving systems or processes to make work better.", OPT_FREQ),
+        QItem("q12", "Would rather invent a new game than play an existing one by the rules.", OPT_FREQ),
+        # Dimension 3: Cognitive Strengths
+        QItem("q13", "My child shows a natural talent or passion for solving logic puzzles or asking 'why' questions.", OPT_DESCRIBE),
+        QItem("q14", "Reading, writing stories, or has a large vocabulary for their age.", OPT_DESCRIBE),
+        QItem("q15", "Recognizing melodies, has a good sense of rhythm, or drawn to musical instruments.", OPT_DESCRIBE),
+        QItem("q16", "Navigating new places, reading maps, or enjoys activities like drawing, painting, or sculpting.", OPT_DESCRIBE),
+        QItem("q17", "Understanding other people's feelings and is good at cooperating in a group.", OPT_DESCRIBE),
+        QItem("q18", "Being in nature, caring for animals, or noticing details in the natural world.", OPT_DESCRIBE),
+        # Dimension 4: Social-Emotional Profile
+        QItem("q19", "Able to calmly express their feelings, even when upset.", OPT_USUALLY),
+        QItem("q20", "Prefers playing with one or two close friends rather than a large group.", OPT_USUALLY),
+        QItem("q21", "Easily picks up on the moods and emotions of people around them.", OPT_USUALLY),
+        QItem("q22", "Can bounce back from disappointments or setbacks in a reasonable amount of time.", OPT_USUALLY),
+        QItem("q23", "Comfortable starting conversations with new children or joining a group already at play.", OPT_USUALLY),
+        QItem("q24", "Will stand up for others or try to mediate when there is conflict between friends.", OPT_USUALLY),
+        # Dimension 5: Biblical Identity Markers
+        QItem("q25", "Praised for their unique ideas and creative spirit (Created).", OPT_AGREE),
+        QItem("q26", "Given a special role or purpose that helps others (Called).", OPT_AGREE),
+        QItem("q27", "Recognized for a specific skill or talent they have developed (Capable).", OPT_AGREE),
+        QItem("q28", "Feeling like a valued member of family, team, or church group (Connected).", OPT_AGREE),
+        QItem("q29", "Encouraged to use personal gifts to bless someone else (Called/Capable).", OPT_AGREE),
+        QItem("q30", "Reminded that they are loved unconditionally (Created/Connected).", OPT_AGREE),
+    )
+    return tuple(q._replace(label=f"**{n}.** {q.question}") for n, q in enumerate(questions, 1))
+
+# All 30 questions, in display order
+QUESTIONS = _build_questions()
+_ANSWER_KEYS = tuple(q.key for q in QUESTIONS)
+# Case-folded answer text -> catalog option per question, for uploaded CSVs
+_CANONICAL_OPTIONS: Final[Mapping[str, Mapping[str, str]]] = {
+    q.key: {option.casefold(): option for option in q.options} for q in QUESTIONS
+}
+
+def format_responses(answers: Mapping[str, str]) -> str:
+    """Format answers as "q1: ...\nq2: ..." lines, in catalog order."""
+    return "\n".join(f"{k}: {answers[k]}" for k in _ANSWER_KEYS)
+
+SECTION_HEADINGS = (
+    "📚 Dimension 1: Learning Style Preferences",
+    "🎯 Dimension 2: Developmental Orientation Profile",
+    "🧠 Dimension 3: Cognitive Strengths",
+    "💝 Dimension 4: Social-Emotional Profile",
+    "✝️ Dimension 5: Biblical Identity Markers",
+)
+QUESTIONS_PER_SECTION = 6
+
+# ---------------- AI Prompt ----------------
+
+# Kept byte-identical across calls so OpenAI's automatic prefix cache can hit;
+# never interpolate per-request data (answers, model, timestamps) into it.
+SYSTEM_PROMPT: Final[str] = """You are Dr. Emily Richardson, a renowned child development specialist with 20+ years of experience in educational psychology, learning theory, and faith-based education.
+
+Create a comprehensive, warm, and insightful learning profile analysis."""
+
+# Static instructions lead the user message and the only placeholders sit at
+# the tail, so the whole system + instruction prefix is cacheable across reports.
+# Filled by build_messages with responses=format_responses(...), s=Scores and
+# the min_words/max_words length that fits the request's output token limit.
+USER_PROMPT_TEMPLATE: Final[str] = """Analyze the assessment responses at the end of this message and create a detailed learning profile.
+
+Provide analysis with these sections (use ## for section headers):
+
+## Executive Summary
+2-3 sentences capturing the essence of this child's profile.
+
+## Primary Learning Style
+Identify Visual/Auditory/Kinesthetic with evidence and percentages.
+
+## Cognitive Strengths Profile
+Top 2-3 multiple intelligences with specific examples.
+
+## Developmental Orientation
+Leadership, creativity, collaboration, problem-solving approach.
+
+## Social-Emotional Landscape
+Emotional regulation, social preferences, empathy, resilience.
+
+## Biblical Identity & Purpose
+How they embody Created, Called, Capable, Connected.
+
+## Personalized Recommendations
+
+### For Parents (5-6 strategies)
+Specific daily practices, environment setup, communication approaches.
+
+### For Educators (3-4 strategies)
+Classroom accommodations, assessment methods, group work.
+
+### Potential Challenges & Solutions (2-3)
+Areas of struggle with proactive solutions.
+
+## Closing Affirmation
+Powerful, personalized affirmation of this child's value and potential.
+
+Use warm, encouraging language. Be specific based on actual responses.
+
+RESPONSES:
+{responses}
+
+DIMENSION SCORES: visual={s.visual}/6 auditory={s.auditory}/6 kinesthetic={s.kinesthetic}/6
+
+Length: {min_words}-{max_words} words. End with the literal token STOP on its own line."""
+
+# Per-model request options, resolved once at import so each call is a dict merge.
+# The gpt-4o family takes max_completion_tokens; gpt-4-turbo keeps max_tokens.
+MODEL_TOKEN_PARAM: Final[Dict[str, str]] = {
+    "gpt-4o": "max_completion_tokens",
+    "gpt-4o-mini": "max_completion_tokens",
+    "gpt-4-turbo": "max_tokens",
+}
+MODEL_KWARGS: Final[Dict[str, Dict]] = {
+    "gpt-4o": {"temperature": 0.5},
+    "gpt-4o-mini": {"temperature": 0.5},
+    "gpt-4-turbo": {"temperature": 0.5},
+}
+
+# The STOP line the instructions ask for ends a full analysis where the report
+# ends; the Analysis Detail slider (600-1500) sets the output token limit.
+ANALYSIS_STOP: Final[Tuple[str, ...]] = ("\nSTOP",)
+
+# Requested length as a share of the token limit: ~0.75 words per token, less
+# headroom for markdown headings and the STOP line, so a full analysis reaches
+# STOP (finish_reason "stop") instead of being cut off at the limit.
+ANALYSIS_WORDS_PER_TOKEN = 0.6
+
+# Retries the SDK makes, with exponential backoff honoring Retry-After, on
+# rate limits, timeouts, connection errors and 5xx; other errors surface at once.
+API_MAX_RETRIES = 3
+
+# Finished reports (analysis, PDF bytes, file name) kept per session for instant re-downloads
+PDF_CACHE_SIZE = 8
+
+# Analyses are reused for identical (answers, model, depth, key) submissions.
+# Streaming output can't be wrapped in st.cache_data, so a bounded
+# process-wide LRU store is used instead.
+ANALYSIS_CACHE_SIZE = 256
+
+# Behind the in-memory store, analyses persist in a local SQLite table so
+# repeat submissions survive restarts. Both layers expire an analysis
+# ANALYSIS_DB_TTL after it was generated.
+ANALYSIS_DB_PATH = os.getenv('KIDV_CACHE_PATH', '.kidv_cache.sqlite3')
+ANALYSIS_DB_TTL = 30 * 86400
+
+# Classroom mode asks for all profiles in one request; output is bounded by
+# the smallest max_tokens limit among the offered models (gpt-4-turbo).
+CLASSROOM_TOKENS_PER_CHILD = 500
+CLASSROOM_MAX_CHILDREN = 8
+
+# Queued classroom batches run one full analysis per child through the Batch
+# API (half price, results within 24h), so they take far larger uploads.
+BATCH_MAX_CHILDREN = 500
+
+# Full profiles needed right away fan out as concurrent requests instead; the
+# worker count bounds in-flight requests across all sessions, and the SDK's
+# own backoff retries rate-limit and 5xx responses.
+PARALLEL_MAX_CHILDREN = 30
+PARALLEL_REQUESTS = 8
+PARALLEL_MAX_RETRIES = 5
+# These calls aren't streamed, so no bytes arrive until the whole analysis is
+# generated; the read timeout must cover a full generation (the SDK's own
+# non-streaming default) or a slow run times out and is retried and re-billed.
+PARALLEL_READ_TIMEOUT = 600.0
+
+CLASSROOM_INSTRUCTIONS: Final[str] = """Analyze the assessment responses for each child below and write one learning profile per child.
+
+Start each profile with a header of the form "## Child N: Name" (or "## Child N" when no name is given) matching the "--- CHILD N ---" label, and cover:
+- Primary learning style (Visual/Auditory/Kinesthetic) with evidence
+- Top 2 cognitive strengths
+- Social-emotional notes
+- Biblical identity (Created, Called, Capable, Connected)
+- 3-4 classroom strategies for the teacher
+
+Use warm, encouraging language. Be specific based on actual responses. Length: 200-300 words per child."""
+
 # ---------------- PDF Generation Functions ----------------
 
+# Markdown hashes and section emojis removed from AI analysis headings in one pass
+_HEADING_STRIP = re.compile('[#🎯📚🧠💝✝\ufe0f🚀🌟]+')
+# A run of non-empty lines, i.e. one section of the analysis between blank lines
+_ANALYSIS_SECTION = re.compile(r'[^\n]+(?:\n[^\n]+)*')
+# Learning-style questions list their options in visual, auditory, kinesthetic
+# order, so every (question, option) pair resolves to a Scores field index
+_LEARNING_STYLE_KEYS = tuple(q.key for q in QUESTIONS[:QUESTIONS_PER_SECTION])
+_ANSWER_TO_STYLE: Final[Mapping[Tuple[str, str], int]] = {
+    (q.key, option): style
+    for q in QUESTIONS[:QUESTIONS_PER_SECTION]
+    for style, option in enumerate(q.options)
+}
+
+# Report dimension titles and their question keys, in report order
+_DIMENSIONS: Final[Tuple[Tuple[str, Tuple[str, ...]], ...]] = (
+    ('Learning Style Preferences', ('q1', 'q2', 'q3', 'q4', 'q5', 'q6')),
+    ('Developmental Orientation', ('q7', 'q8', 'q9', 'q10', 'q11', 'q12')),
+    ('Cognitive Strengths', ('q13', 'q14', 'q15', 'q16', 'q17', 'q18')),
+    ('Social-Emotional Profile', ('q19', 'q20', 'q21', 'q22', 'q23', 'q24')),
+    ('Biblical Identity Markers', ('q25', 'q26', 'q27', 'q28', 'q29', 'q30')),
+)
+
+_RESPONSE_COL_WIDTHS = (3*inch, 2.5*inch)
+
+# Short question wording used in the report's response tables
+_QUESTION_TEXTS: Final[Mapping[str, str]] = {
+    'q1': 'My child tends to remember things best after...',
+    'q2': 'When assembling a new toy, they are most likely to...',
+    'q3': 'Express themselves and their ideas through...',
+    'q4': 'When spelling a new word, they often...',
+    'q5': 'Most distracted in classroom by...',
+    'q6': 'Enjoy books that have...',
+    'q7': 'Organizes the plan and makes sure everyone knows their role',
+    'q8': 'Comes up with imaginative and original ideas',
+    'q9': 'Focuses on making sure everyone feels included',
+    'q10': 'Is eager to start building or making physical parts',
+    'q11': 'Enjoys improving systems or processes',
+    'q12': 'Would rather invent a new game than play by rules',
+    'q13': 'Shows talent for solving logic puzzles or asking why questions',
+    'q14': 'Reading, writing stories, or large vocabulary',
+    'q15': 'Recognizing melodies, good sense of rhythm, or drawn to instruments',
+    'q16': 'Navigating new places, reading maps, or enjoys drawing/painting',
+    'q17': 'Understanding other people\'s feelings and cooperating in groups',
+    'q18': 'Being in nature, caring for animals, or noticing natural details',
+    'q19': 'Able to calmly express their feelings, even when upset',
+    'q20': 'Prefers playing with one or two close friends rather than large group',
+    'q21': 'Easily picks up on the moods and emotions of people around them',
+    'q22': 'Can bounce back from disappointments or setbacks',
+    'q23': 'Comfortable starting conversations with new children',
+    'q24': 'Will stand up for others or try to mediate conflicts',
+    'q25': 'Praised for their unique ideas and creative spirit (Created)',
+    'q26': 'Given a special role or purpose that helps others (Called)',
+    'q27': 'Recognized for a specific skill or talent developed (Capable)',
+    'q28': 'Feeling like a valued member of family/team/church (Connected)',
+    'q29': 'Encouraged to use personal gifts to bless someone else',
+    'q30': 'Reminded that they are loved unconditionally'
+}
+
+# Fixed report markup, parsed once per process by _fixed_paragraph_frags
+MISSION_HTML: Final[str] = """
+    <i>"At KidVentures Learning, we believe every child is uniquely created by God with specific gifts, 
+    talents, and a divine purpose. This comprehensive assessment reveals your child's learning profile 
+    across five critical dimensions, empowering you to support their educational journey with 
+    confidence and biblical wisdom."</i>
+    """
+
+CONTACT_LINE_HTML: Final[str] = "📧 info@kidventureslearning.com | 📞 (404) 631-6320 | 🌐 www.kidventureslearning.com"
+
+NEXT_STEPS_HTML: Final[str] = """
+    <b>Immediate Actions (This Week):</b><br/>
+    ☐ Share this report with your child's teacher or educational team<br/>
+    ☐ Discuss one key strength with your child to affirm their identity<br/>
+    ☐ Implement one learning style recommendation in your home<br/>
+    ☐ Create a dedicated study space that matches their learning preferences<br/><br/>
+    
+    <b>Short-term Goals (This Month):</b><br/>
+    ☐ Schedule a family meeting to discuss the Biblical identity insights<br/>
+    ☐ Adjust homework routines based on learning style recommendations<br/>
+    ☐ Explore enrichment activities that align with cognitive strengths<br/>
+    ☐ Connect with other parents of children with similar profiles<br/><br/>
+    
+    <b>Long-term Development (This Year):</b><br/>
+    ☐ Track progress and note changes in learning preferences<br/>
+    ☐ Schedule follow-up assessment in 6-12 months<br/>
+    ☐ Build a portfolio of work that showcases their unique strengths<br/>
+    ☐ Develop a personalized education plan with measurable goals<br/><br/>
+    
+    <b>Resources & Support:</b><br/>
+    • <b>Consultation:</b> Schedule a 1-on-1 consultation with our learning specialists<br/>
+    • <b>Workshops:</b> Attend our monthly parent workshops on learning styles<br/>
+    • <b>Community:</b> Join our online community of KidVentures families<br/>
+    • <b>Materials:</b> Access our library of learning resources tailored to your child's profile<br/>
+    """
+
+CONTACT_BOX_HTML: Final[str] = """
+    <b>Ready to Take the Next Step?</b><br/><br/>
+    Contact KidVentures Learning today to discuss how we can support your child's unique learning journey.<br/><br/>
+    📧 Email: info@kidventureslearning.com<br/>
+    📞 Phone: (404) 631-6320<br/>
+    🌐 Website: www.kidventureslearning.com<br/><br/>
+    <i>Learning with Confidence. Leading with Purpose.</i>
+    """
+
+# Per-report markup, filled by build_report_frame from a Scores tuple
+INTERPRETATION_HTML: Final[str] = """
+        <b>Learning Style Breakdown:</b><br/>
+        • Visual Learning: {s.visual_pct:.0f}% ({s.visual}/6 indicators)<br/>
+        • Auditory Learning: {s.auditory_pct:.0f}% ({s.auditory}/6 indicators)<br/>
+        • Kinesthetic Learning: {s.kinesthetic_pct:.0f}% ({s.kinesthetic}/6 indicators)<br/><br/>
+        
+        This distribution reveals your child's preferred ways of receiving and processing information.
+        """
+
 class NumberedCanvas(canvas.Canvas):
     """Custom canvas for page numbers and headers"""
+    # Per-page attributes that Canvas.showPage emits and _startPage replaces;
+    # saving just these avoids a full __dict__ copy for every page
+    _PAGE_STATE_KEYS = (
+        '_pageNumber', '_code', '_psCommandsAfterPage', '_currentPageHasImages',
+        '_formsinuse', '_annotationrefs', '_formData', '_extgstate',
+        '_pageRotation', '_pageDuration', '_pageTransition',
+    )
+
     def __init__(self, *args, **kwargs):
         canvas.Canvas.__init__(self, *args, **kwargs)
         self._saved_page_states = []
 
     def showPage(self):
-        self._saved_page_states.append(dict(self.__dict__))
+        state = self.__dict__
+        self._saved_page_states.append({k: state[k] for k in self._PAGE_STATE_KEYS if k in state})
         self._startPage()
 
     def save(self):
@@ -59,11 +413,12 @@ class NumberedCanvas(canvas.Canvas):
         self.drawRightString(7.5*inch, 0.5*inch, page_num)
         self.drawString(1*inch, 0.5*inch, "© 2024 KidVentures Learning")
 
-def create_learning_style_chart(scores: Dict) -> Drawing:
-    """Create a pie chart for learning styles"""
+def _draw_learning_style_chart(data: Tuple[int, int, int]) -> Drawing:
+    """Lay out the learning style pie chart for (visual, auditory, kinesthetic) scores"""
+    from reportlab.graphics.charts.piecharts import Pie
+    
     drawing = Drawing(400, 200)
     
-    data = [scores.get('visual', 0), scores.get('auditory', 0), scores.get('kinesthetic', 0)]
     total = sum(data)
     
     if total > 0:
@@ -72,7 +427,7 @@ def create_learning_style_chart(scores: Dict) -> Drawing:
         pie.y = 25
         pie.width = 150
         pie.height = 150
-        pie.data = data
+        pie.data = list(data)
         pie.labels = [f'Visual\n{data[0]}/6', f'Auditory\n{data[1]}/6', f'Kinesthetic\n{data[2]}/6']
         pie.slices.strokeWidth = 0.5
         pie.slices[0].fillColor = colors.HexColor('#667eea')
@@ -83,8 +438,27 @@ def create_learning_style_chart(scores: Dict) -> Drawing:
     
     return drawing
 
+def create_learning_style_chart(scores: "Scores", store: Optional[Dict] = None) -> Drawing:
+    """Create a pie chart for learning styles
+
+    With a store (see _chart_store) the chart widgets are expanded to plain
+    shapes once per distinct score tuple. Each call gets a deep copy: the
+    renderer sets and deletes _parent on every child node while drawing, so
+    concurrent builds must never share nodes.
+    """
+    data = tuple(scores)
+    if store is None:
+        return _draw_learning_style_chart(data)
+    
+    drawing = store.get(data)
+    if drawing is None:
+        drawing = store[data] = _draw_learning_style_chart(data).expandUserNodes()
+    return copy.deepcopy(drawing)
+
 def create_dimension_bar_chart(dimension_scores: Dict) -> Drawing:
     """Create a bar chart for dimension scores"""
+    from reportlab.graphics.charts.barcharts import VerticalBarChart
+    
     drawing = Drawing(400, 200)
     
     bc = VerticalBarChart()
@@ -109,145 +483,247 @@ def create_dimension_bar_chart(dimension_scores: Dict) -> Drawing:
     
     return drawing
 
-def calculate_dimension_scores(answers: Dict) -> Dict:
+class Scores(NamedTuple):
+    """Learning style indicator counts, each out of six"""
+    visual: int
+    auditory: int
+    kinesthetic: int
+
+    @property
+    def total(self) -> int:
+        return self.visual + self.auditory + self.kinesthetic
+
+    @property
+    def visual_pct(self) -> float:
+        return self.visual / 6 * 100
+
+    @property
+    def auditory_pct(self) -> float:
+        return self.auditory / 6 * 100
+
+    @property
+    def kinesthetic_pct(self) -> float:
+        return self.kinesthetic / 6 * 100
+
+def calculate_dimension_scores(answers: Dict) -> Scores:
     """Calculate scores for each dimension"""
-    scores = {
-        'visual': 0,
-        'auditory': 0,
-        'kinesthetic': 0,
-    }
-    
-    # Learning styles (questions 1-6)
-    learning_map = {
-        'q1': ['written', 'spoken', 'physical'],
-        'q2': ['diagram', 'read', 'handling'],
-        'q3': ['drawing', 'talking', 'gesturing'],
-        'q4': ['visualize', 'sound', 'write'],
-        'q5': ['messy', 'noise', 'sit still'],
-        'q6': ['illustr', 'captivat', 'interact']
-    }
+    counts = [0, 0, 0]
     
-    for q_key, keywords in learning_map.items():
-        answer = answers.get(q_key, '').lower()
-        if keywords[0] in answer or 'visual' in answer or 'picture' in answer:
-            scores['visual'] += 1
-        elif keywords[1] in answer or 'audi' in answer or 'hear' in answer:
-            scores['auditory'] += 1
-        elif keywords[2] in answer or 'kines' in answer or 'doing' in answer or 'build' in answer or 'texture' in answer:
-            scores['kinesthetic'] += 1
+    # Learning styles (questions 1-6): each answer option maps to exactly one style
+    for q_key in _LEARNING_STYLE_KEYS:
+        style = _ANSWER_TO_STYLE.get((q_key, answers.get(q_key)))
+        if style is not None:
+            counts[style] += 1
     
-    return scores
+    return Scores(*counts)
 
-def generate_pdf_report(analysis: str, answers: Dict, timestamp: str, model: str) -> BytesIO:
-    """Generate a comprehensive PDF report"""
-    
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=letter,
-        rightMargin=72,
-        leftMargin=72,
-        topMargin=72,
-        bottomMargin=72
-    )
-    
-    # Get styles
+class PdfStyles(NamedTuple):
+    """Paragraph and table styles shared by every generated report"""
+    title: ParagraphStyle
+    subtitle: ParagraphStyle
+    heading1: ParagraphStyle
+    heading2: ParagraphStyle
+    body: ParagraphStyle
+    highlight: ParagraphStyle
+    recommendation: ParagraphStyle
+    contact: ParagraphStyle
+    info_table: TableStyle
+    toc_table: TableStyle
+    response_table: TableStyle
+
+@st.cache_resource(show_spinner=False)
+def _pdf_styles() -> PdfStyles:
+    """Build the report styles once per process; they are never mutated during a build"""
     styles = getSampleStyleSheet()
     
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#667eea'),
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
-    )
-    
-    heading1_style = ParagraphStyle(
-        'CustomHeading1',
-        parent=styles['Heading1'],
-        fontSize=16,
-        textColor=colors.HexColor('#764ba2'),
-        spaceAfter=12,
-        spaceBefore=12,
-        fontName='Helvetica-Bold',
-        borderWidth=1,
-        borderColor=colors.HexColor('#667eea'),
-        borderPadding=5,
-        backColor=colors.HexColor('#f0f0ff')
-    )
-    
-    heading2_style = ParagraphStyle(
-        'CustomHeading2',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#667eea'),
-        spaceAfter=10,
-        spaceBefore=10,
-        fontName='Helvetica-Bold'
-    )
-    
-    body_style = ParagraphStyle(
-        'CustomBody',
-        parent=styles['BodyText'],
-        fontSize=11,
-        alignment=TA_JUSTIFY,
-        spaceAfter=10,
-        leading=14
-    )
-    
-    highlight_style = ParagraphStyle(
-        'Highlight',
-        parent=styles['BodyText'],
-        fontSize=11,
-        backColor=colors.HexColor('#fff3cd'),
-        borderWidth=1,
-        borderColor=colors.HexColor('#ffc107'),
-        borderPadding=10,
-        spaceAfter=10,
-        spaceBefore=10
-    )
-    
-    recommendation_style = ParagraphStyle(
-        'Recommendation',
-        parent=styles['BodyText'],
-        fontSize=11,
-        backColor=colors.HexColor('#e7f3ff'),
-        borderWidth=1,
-        borderColor=colors.HexColor('#2196F3'),
-        borderPadding=10,
-        leftIndent=20,
-        spaceAfter=8
+    return PdfStyles(
+        title=ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor('#667eea'),
+            spaceAfter=30,
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold'
+        ),
+        subtitle=ParagraphStyle(
+            'Subtitle',
+            parent=styles['Normal'],
+            fontSize=18,
+            textColor=colors.HexColor('#764ba2'),
+            alignment=TA_CENTER,
+            spaceAfter=30
+        ),
+        heading1=ParagraphStyle(
+            'CustomHeading1',
+            parent=styles['Heading1'],
+            fontSize=16,
+            textColor=colors.HexColor('#764ba2'),
+            spaceAfter=12,
+            spaceBefore=12,
+            fontName='Helvetica-Bold',
+            borderWidth=1,
+            borderColor=colors.HexColor('#667eea'),
+            borderPadding=5,
+            backColor=colors.HexColor('#f0f0ff')
+        ),
+        heading2=ParagraphStyle(
+            'CustomHeading2',
+            parent=styles['Heading2'],
+            fontSize=14,
+            textColor=colors.HexColor('#667eea'),
+            spaceAfter=10,
+            spaceBefore=10,
+            fontName='Helvetica-Bold'
+        ),
+        body=ParagraphStyle(
+            'CustomBody',
+            parent=styles['BodyText'],
+            fontSize=11,
+            alignment=TA_JUSTIFY,
+            spaceAfter=10,
+            leading=14
+        ),
+        highlight=ParagraphStyle(
+            'Highlight',
+            parent=styles['BodyText'],
+            fontSize=11,
+            backColor=colors.HexColor('#fff3cd'),
+            borderWidth=1,
+            borderColor=colors.HexColor('#ffc107'),
+            borderPadding=10,
+            spaceAfter=10,
+            spaceBefore=10
+        ),
+        recommendation=ParagraphStyle(
+            'Recommendation',
+            parent=styles['BodyText'],
+            fontSize=11,
+            backColor=colors.HexColor('#e7f3ff'),
+            borderWidth=1,
+            borderColor=colors.HexColor('#2196F3'),
+            borderPadding=10,
+            leftIndent=20,
+            spaceAfter=8
+        ),
+        contact=ParagraphStyle(
+            'Contact',
+            parent=styles['Normal'],
+            fontSize=10,
+            alignment=TA_CENTER,
+            textColor=colors.grey
+        ),
+        info_table=TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f8f9fa')),
+            ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#667eea')),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 11),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#667eea')),
+            ('ROWBACKGROUNDS', (0, 0), (-1, -1), [colors.white, colors.HexColor('#f0f0ff')]),
+            ('PADDING', (0, 0), (-1, -1), 12),
+        ]),
+        toc_table=TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#667eea')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 11),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
+            ('PADDING', (0, 0), (-1, -1), 10),
+        ]),
+        # One instance reused by all five dimension response tables
+        response_table=TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#667eea')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
+            ('PADDING', (0, 0), (-1, -1), 8),
+        ]),
     )
-    
-    # Container for the story
-    story = []
+
+@st.cache_resource(show_spinner=False)
+def _fixed_paragraph_frags() -> Dict[str, Tuple[str, List, ParagraphStyle]]:
+    """Run ReportLab's markup parser over the fixed report text once per process.
+
+    Paragraph objects hold layout state after wrap(), so they are not shared
+    between builds; each report gets new Paragraphs over these parsed frags.
+    """
+    styles = _pdf_styles()
+    fixed = {
+        'mission': (MISSION_HTML, styles.body),
+        'contact_line': (CONTACT_LINE_HTML, styles.contact),
+        'next_steps': (NEXT_STEPS_HTML, styles.body),
+        'contact_box': (CONTACT_BOX_HTML, styles.recommendation),
+    }
+    return {name: (text, Paragraph(text, style).frags, style) for name, (text, style) in fixed.items()}
+
+def _fixed_paragraph(entry: Tuple[str, List, ParagraphStyle]) -> Paragraph:
+    """New Paragraph over pre-parsed frags, skipping the markup parser"""
+    text, frags, style = entry
+    return Paragraph(text, style, frags=list(frags))
+
+@st.cache_resource(show_spinner=False)
+def _report_executor() -> ThreadPoolExecutor:
+    """Worker threads for PDF preparation, shared by all sessions."""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="pdf")
+
+@st.cache_resource(show_spinner=False)
+def _chart_store() -> Dict[Tuple, Drawing]:
+    """Expanded chart drawings keyed by score tuple, shared by all sessions"""
+    return {}
+
+class ReportAssets(NamedTuple):
+    """Process-wide, read-only inputs for building reports"""
+    styles: PdfStyles
+    fixed: Dict[str, Tuple[str, List, ParagraphStyle]]
+    charts: Dict[Tuple, Drawing]
+
+def report_assets() -> ReportAssets:
+    """Collect the cached report inputs; call on the script thread, not a worker"""
+    return ReportAssets(_pdf_styles(), _fixed_paragraph_frags(), _chart_store())
+
+class ReportFrame(NamedTuple):
+    """Report flowables that don't depend on the AI analysis"""
+    front: List  # cover page, table of contents, learning style chart
+    back: List   # assessment responses, next steps, contact
+
+def build_report_frame(answers: Dict, timestamp: str, model: str, assets: ReportAssets) -> ReportFrame:
+    """Build the analysis-independent parts of the report.
+
+    Touches no Streamlit APIs, so it can run on a worker thread while the
+    AI response is still streaming; assets come from report_assets().
+    """
+    styles, fixed = assets.styles, assets.fixed
+    front = []
     
     # ========== COVER PAGE ==========
     
     # Logo/Header
-    story.append(Spacer(1, 0.5*inch))
-    
-    title = Paragraph("KidVentures Learning", title_style)
-    story.append(title)
-    
-    subtitle_style = ParagraphStyle(
-        'Subtitle',
-        parent=styles['Normal'],
-        fontSize=18,
-        textColor=colors.HexColor('#764ba2'),
-        alignment=TA_CENTER,
-        spaceAfter=30
-    )
-    story.append(Paragraph("Comprehensive Learning Profile Assessment", subtitle_style))
+    front.append(Spacer(1, 0.5*inch))
     
-    story.append(Spacer(1, 0.5*inch))
+    title = Paragraph("KidVentures Learning", styles.title)
+    front.append(title)
+    
+    front.append(Paragraph("Comprehensive Learning Profile Assessment", styles.subtitle))
+    
+    front.append(Spacer(1, 0.5*inch))
     
     # Decorative line
-    story.append(HRFlowable(width="100%", thickness=2, color=colors.HexColor('#667eea')))
-    story.append(Spacer(1, 0.3*inch))
+    front.append(HRFlowable(width="100%", thickness=2, color=colors.HexColor('#667eea')))
+    front.append(Spacer(1, 0.3*inch))
     
     # Report info box
     info_data = [
@@ -258,48 +734,24 @@ def generate_pdf_report(analysis: str, answers: Dict, timestamp: str, model: str
     ]
     
     info_table = Table(info_data, colWidths=[2*inch, 3.5*inch])
-    info_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f8f9fa')),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#667eea')),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 11),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#667eea')),
-        ('ROWBACKGROUNDS', (0, 0), (-1, -1), [colors.white, colors.HexColor('#f0f0ff')]),
-        ('PADDING', (0, 0), (-1, -1), 12),
-    ]))
-    
-    story.append(info_table)
-    story.append(Spacer(1, 0.5*inch))
+    info_table.setStyle(styles.info_table)
+    
+    front.append(info_table)
+    front.append(Spacer(1, 0.5*inch))
     
     # Mission statement
-    mission_text = """
-    <i>"At KidVentures Learning, we believe every child is uniquely created by God with specific gifts, 
-    talents, and a divine purpose. This comprehensive assessment reveals your child's learning profile 
-    across five critical dimensions, empowering you to support their educational journey with 
-    confidence and biblical wisdom."</i>
-    """
-    story.append(Paragraph(mission_text, body_style))
-    story.append(Spacer(1, 0.5*inch))
+    front.append(_fixed_paragraph(fixed['mission']))
+    front.append(Spacer(1, 0.5*inch))
     
     # Contact info
-    contact_style = ParagraphStyle(
-        'Contact',
-        parent=styles['Normal'],
-        fontSize=10,
-        alignment=TA_CENTER,
-        textColor=colors.grey
-    )
-    story.append(Paragraph("📧 info@kidventureslearning.com | 📞 (404) 631-6320 | 🌐 www.kidventureslearning.com", contact_style))
+    front.append(_fixed_paragraph(fixed['contact_line']))
     
-    story.append(PageBreak())
+    front.append(PageBreak())
     
     # ========== TABLE OF CONTENTS ==========
     
-    story.append(Paragraph("Table of Contents", heading1_style))
-    story.append(Spacer(1, 0.2*inch))
+    front.append(Paragraph("Table of Contents", styles.heading1))
+    front.append(Spacer(1, 0.2*inch))
     
     toc_data = [
         ['Section', 'Page'],
@@ -315,214 +767,131 @@ def generate_pdf_report(analysis: str, answers: Dict, timestamp: str, model: str
     ]
     
     toc_table = Table(toc_data, colWidths=[4*inch, 1.5*inch])
-    toc_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#667eea')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 11),
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
-        ('PADDING', (0, 0), (-1, -1), 10),
-    ]))
-    
-    story.append(toc_table)
-    story.append(PageBreak())
+    toc_table.setStyle(styles.toc_table)
+    
+    front.append(toc_table)
+    front.append(PageBreak())
     
     # ========== LEARNING STYLE VISUALIZATION ==========
     
-    story.append(Paragraph("Learning Style Distribution", heading1_style))
-    story.append(Spacer(1, 0.2*inch))
+    front.append(Paragraph("Learning Style Distribution", styles.heading1))
+    front.append(Spacer(1, 0.2*inch))
     
     # Calculate scores
     scores = calculate_dimension_scores(answers)
     
     # Add pie chart
-    chart = create_learning_style_chart(scores)
-    story.append(chart)
-    story.append(Spacer(1, 0.2*inch))
+    chart = create_learning_style_chart(scores, assets.charts)
+    front.append(chart)
+    front.append(Spacer(1, 0.2*inch))
     
     # Interpretation
-    total = sum(scores.values())
-    if total > 0:
-        visual_pct = (scores['visual'] / 6) * 100
-        auditory_pct = (scores['auditory'] / 6) * 100
-        kinesthetic_pct = (scores['kinesthetic'] / 6) * 100
-        
-        interpretation = f"""
-        <b>Learning Style Breakdown:</b><br/>
-        • Visual Learning: {visual_pct:.0f}% ({scores['visual']}/6 indicators)<br/>
-        • Auditory Learning: {auditory_pct:.0f}% ({scores['auditory']}/6 indicators)<br/>
-        • Kinesthetic Learning: {kinesthetic_pct:.0f}% ({scores['kinesthetic']}/6 indicators)<br/><br/>
-        
-        This distribution reveals your child's preferred ways of receiving and processing information.
-        """
-        story.append(Paragraph(interpretation, body_style))
-    
-    story.append(PageBreak())
+    if scores.total > 0:
+        front.append(Paragraph(INTERPRETATION_HTML.format(s=scores), styles.body))
     
-    # ========== AI ANALYSIS SECTIONS ==========
-    
-    story.append(Paragraph("Comprehensive AI Analysis", heading1_style))
-    story.append(Spacer(1, 0.2*inch))
+    front.append(PageBreak())
     
-    # Parse and format the analysis
-    analysis_sections = analysis.split('\n\n')
-    
-    for section in analysis_sections:
-        if not section.strip():
-            continue
-            
-        # Check if it's a heading (starts with ## or #)
-        if section.strip().startswith('##'):
-            # Remove ## and format as heading
-            heading_text = section.strip().replace('##', '').replace('🎯', '').replace('📚', '').replace('🧠', '').replace('💝', '').replace('✝️', '').replace('🚀', '').replace('🌟', '').strip()
-            story.append(Paragraph(heading_text, heading2_style))
-        elif section.strip().startswith('#'):
-            heading_text = section.strip().replace('#', '').strip()
-            story.append(Paragraph(heading_text, heading1_style))
-        else:
-            # Check for special formatting markers
-            if section.strip().startswith('**') or '**KEY INSIGHT:**' in section:
-                story.append(Paragraph(section.replace('**', ''), highlight_style))
-            elif section.strip().startswith('•') or section.strip().startswith('-') or section.strip().startswith('1.'):
-                # List items
-                story.append(Paragraph(section, body_style))
-            else:
-                # Regular paragraph
-                story.append(Paragraph(section, body_style))
-        
-        story.append(Spacer(1, 0.1*inch))
-    
-    story.append(PageBreak())
+    back = []
     
     # ========== DETAILED RESPONSES ==========
     
-    story.append(Paragraph("Complete Assessment Responses", heading1_style))
-    story.append(Spacer(1, 0.2*inch))
+    back.append(Paragraph("Complete Assessment Responses", styles.heading1))
+    back.append(Spacer(1, 0.2*inch))
     
     # Group responses by dimension
-    dimensions = {
-        'Learning Style Preferences': ['q1', 'q2', 'q3', 'q4', 'q5', 'q6'],
-        'Developmental Orientation': ['q7', 'q8', 'q9', 'q10', 'q11', 'q12'],
-        'Cognitive Strengths': ['q13', 'q14', 'q15', 'q16', 'q17', 'q18'],
-        'Social-Emotional Profile': ['q19', 'q20', 'q21', 'q22', 'q23', 'q24'],
-        'Biblical Identity Markers': ['q25', 'q26', 'q27', 'q28', 'q29', 'q30']
-    }
-    
-    question_texts = {
-        'q1': 'My child tends to remember things best after...',
-        'q2': 'When assembling a new toy, they are most likely to...',
-        'q3': 'Express themselves and their ideas through...',
-        'q4': 'When spelling a new word, they often...',
-        'q5': 'Most distracted in classroom by...',
-        'q6': 'Enjoy books that have...',
-        'q7': 'Organizes the plan and makes sure everyone knows their role',
-        'q8': 'Comes up with imaginative and original ideas',
-        'q9': 'Focuses on making sure everyone feels included',
-        'q10': 'Is eager to start building or making physical parts',
-        'q11': 'Enjoys improving systems or processes',
-        'q12': 'Would rather invent a new game than play by rules',
-        'q13': 'Shows talent for solving logic puzzles or asking why questions',
-        'q14': 'Reading, writing stories, or large vocabulary',
-        'q15': 'Recognizing melodies, good sense of rhythm, or drawn to instruments',
-        'q16': 'Navigating new places, reading maps, or enjoys drawing/painting',
-        'q17': 'Understanding other people\'s feelings and cooperating in groups',
-        'q18': 'Being in nature, caring for animals, or noticing natural details',
-        'q19': 'Able to calmly express their feelings, even when upset',
-        'q20': 'Prefers playing with one or two close friends rather than large group',
-        'q21': 'Easily picks up on the moods and emotions of people around them',
-        'q22': 'Can bounce back from disappointments or setbacks',
-        'q23': 'Comfortable starting conversations with new children',
-        'q24': 'Will stand up for others or try to mediate conflicts',
-        'q25': 'Praised for their unique ideas and creative spirit (Created)',
-        'q26': 'Given a special role or purpose that helps others (Called)',
-        'q27': 'Recognized for a specific skill or talent developed (Capable)',
-        'q28': 'Feeling like a valued member of family/team/church (Connected)',
-        'q29': 'Encouraged to use personal gifts to bless someone else',
-        'q30': 'Reminded that they are loved unconditionally'
-    }
-    
-    for dimension, questions in dimensions.items():
-        story.append(Paragraph(f"<b>{dimension}</b>", heading2_style))
+    for dimension, questions in _DIMENSIONS:
+        back.append(Paragraph(f"<b>{dimension}</b>", styles.heading2))
         
-        response_data = [['Question', 'Response']]
-        for q_key in questions:
-            q_text = question_texts.get(q_key, q_key)
-            answer = answers.get(q_key, 'Not answered')
-            response_data.append([q_text, answer])
+        rows = [[_QUESTION_TEXTS.get(q_key, q_key), answers.get(q_key, 'Not answered')] for q_key in questions]
+        response_table = Table([['Question', 'Response'], *rows], colWidths=_RESPONSE_COL_WIDTHS)
+        response_table.setStyle(styles.response_table)
         
-        response_table = Table(response_data, colWidths=[3*inch, 2.5*inch])
-        response_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#667eea')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
-            ('PADDING', (0, 0), (-1, -1), 8),
-        ]))
-        
-        story.append(response_table)
-        story.append(Spacer(1, 0.2*inch))
+        back.append(response_table)
+        back.append(Spacer(1, 0.2*inch))
     
-    story.append(PageBreak())
+    back.append(PageBreak())
     
     # ========== NEXT STEPS ==========
     
-    story.append(Paragraph("Next Steps & Action Plan", heading1_style))
-    story.append(Spacer(1, 0.2*inch))
+    back.append(Paragraph("Next Steps & Action Plan", styles.heading1))
+    back.append(Spacer(1, 0.2*inch))
     
-    next_steps = """
-    <b>Immediate Actions (This Week):</b><br/>
-    ☐ Share this report with your child's teacher or educational team<br/>
-    ☐ Discuss one key strength with your child to affirm their identity<br/>
-    ☐ Implement one learning style recommendation in your home<br/>
-    ☐ Create a dedicated study space that matches their learning preferences<br/><br/>
+    back.append(_fixed_paragraph(fixed['next_steps']))
+    back.append(Spacer(1, 0.3*inch))
     
-    <b>Short-term Goals (This Month):</b><br/>
-    ☐ Schedule a family meeting to discuss the Biblical identity insights<br/>
-    ☐ Adjust homework routines based on learning style recommendations<br/>
-    ☐ Explore enrichment activities that align with cognitive strengths<br/>
-    ☐ Connect with other parents of children with similar profiles<br/><br/>
+    # Contact section
+    back.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor('#667eea')))
+    back.append(Spacer(1, 0.2*inch))
     
-    <b>Long-term Development (This Year):</b><br/>
-    ☐ Track progress and note changes in learning preferences<br/>
-    ☐ Schedule follow-up assessment in 6-12 months<br/>
-    ☐ Build a portfolio of work that showcases their unique strengths<br/>
-    ☐ Develop a personalized education plan with measurable goals<br/><br/>
+    back.append(_fixed_paragraph(fixed['contact_box']))
     
-    <b>Resources & Support:</b><br/>
-    • <b>Consultation:</b> Schedule a 1-on-1 consultation with our learning specialists<br/>
-    • <b>Workshops:</b> Attend our monthly parent workshops on learning styles<br/>
-    • <b>Community:</b> Join our online community of KidVentures families<br/>
-    • <b>Materials:</b> Access our library of learning resources tailored to your child's profile<br/>
+    return ReportFrame(front, back)
+
+def generate_pdf_report(analysis: str, answers: Dict, timestamp: str, model: str,
+                        frame: Optional[ReportFrame] = None,
+                        assets: Optional[ReportAssets] = None) -> BytesIO:
+    """Generate a comprehensive PDF report
+
+    Pass a frame from build_report_frame to reuse flowables prepared ahead of
+    time; otherwise it is built here. Pass assets when running on a worker
+    thread, since report_assets() must be called on the script thread.
     """
     
-    story.append(Paragraph(next_steps, body_style))
-    story.append(Spacer(1, 0.3*inch))
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=letter,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=72,
+        # zlib-compress page streams explicitly rather than relying on rl_config,
+        # and omit per-build timestamps/IDs so identical reports are byte-identical
+        pageCompression=1,
+        invariant=1
+    )
+    
+    # Get styles
+    if assets is None:
+        assets = report_assets()
+    styles = assets.styles
     
-    # Contact section
-    story.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor('#667eea')))
+    if frame is None:
+        frame = build_report_frame(answers, timestamp, model, assets)
+    
+    # Container for the story
+    story = list(frame.front)
+    
+    # ========== AI ANALYSIS SECTIONS ==========
+    
+    story.append(Paragraph("Comprehensive AI Analysis", styles.heading1))
     story.append(Spacer(1, 0.2*inch))
     
-    contact_box = """
-    <b>Ready to Take the Next Step?</b><br/><br/>
-    Contact KidVentures Learning today to discuss how we can support your child's unique learning journey.<br/><br/>
-    📧 Email: info@kidventureslearning.com<br/>
-    📞 Phone: (404) 631-6320<br/>
-    🌐 Website: www.kidventureslearning.com<br/><br/>
-    <i>Learning with Confidence. Leading with Purpose.</i>
-    """
+    # Parse and format the analysis, one blank-line-separated section at a time
+    for match in _ANALYSIS_SECTION.finditer(analysis):
+        section = match.group().strip()
+        if not section:
+            continue
+        
+        # Check if it's a heading (starts with ## or #)
+        if section.startswith('##'):
+            # Remove ## and emojis and format as heading
+            heading_text = _HEADING_STRIP.sub('', section).strip()
+            story.append(Paragraph(heading_text, styles.heading2))
+        elif section.startswith('#'):
+            heading_text = section.replace('#', '').strip()
+            story.append(Paragraph(heading_text, styles.heading1))
+        elif section.startswith('**') or '**KEY INSIGHT:**' in section:
+            story.append(Paragraph(section.replace('**', ''), styles.highlight))
+        else:
+            # List items and regular paragraphs
+            story.append(Paragraph(section, styles.body))
+        
+        story.append(Spacer(1, 0.1*inch))
+    
+    story.append(PageBreak())
     
-    story.append(Paragraph(contact_box, recommendation_style))
+    story.extend(frame.back)
     
     # Build PDF
     doc.build(story, canvasmaker=NumberedCanvas)
@@ -556,9 +925,14 @@ with st.sidebar:
     else:
         st.warning("⚠️ Please enter your OpenAI API key")
     
+    # Digest the key only when it changes; cache keys downstream read the stored hash
+    if st.session_state.get('_hashed_api_key') != st.session_state.openai_api_key:
+        st.session_state.openai_api_key_hash = hash_api_key(st.session_state.openai_api_key)
+        st.session_state._hashed_api_key = st.session_state.openai_api_key
+    
     model_choice = st.selectbox(
         "AI Model",
-        ["gpt-4o", "gpt-4o-mini", "gpt-4-turbo"],
+        list(MODEL_KWARGS),
         index=0,
         help="GPT-4o recommended for best results"
     )
@@ -569,7 +943,7 @@ with st.sidebar:
         max_value=1500,
         value=1000,
         step=100,
-        help="Higher = more detailed (800-1200 words)"
+        help="Output token limit; the requested length scales with it (about 350-900 words)"
     )
     
     st.markdown("---")
@@ -606,195 +980,639 @@ with AI-powered insights, visual analytics, and personalized recommendations.
 """)
 
 # ---------------- Helper Functions ----------------
-def render_radio_question(q_num: int, question: str, options: List[str], key: str):
-    """Render a radio button question and return the selected answer."""
-    return st.radio(f"**{q_num}.** {question}", options, key=key)
+def render_scale_grid(first_num: int, questions: Sequence[QItem], key: str) -> Dict:
+    """Render questions sharing one answer scale as a single editable grid and return {key: answer}."""
+    options = questions[0].options
+    grid = pd.DataFrame(
+        {
+            "#": range(first_num, first_num + len(questions)),
+            "Question": [q.question for q in questions],
+            "Answer": [options[0]] * len(questions),
+        },
+        index=[q.key for q in questions]
+    )
+    edited = st.data_editor(
+        grid,
+        column_config={
+            "#": st.column_config.NumberColumn("#", width="small"),
+            "Question": st.column_config.TextColumn("Question", width="large"),
+            "Answer": st.column_config.SelectboxColumn("Answer", options=list(options), required=True),
+        },
+        disabled=["#", "Question"],
+        hide_index=True,
+        use_container_width=True,
+        key=key
+    )
+    return edited["Answer"].to_dict()
 
-# ---------------- Assessment Form ----------------
-with st.form("full_assessment"):
-    answers = {}
-    
-    # All questions (abbreviated for length - use your original full text)
-    st.subheader("📚 Dimension 1: Learning Style Preferences")
-    answers['q1'] = render_radio_question(1, "My child tends to remember things best after...",
-        ["Seeing them written down or in a picture", "Hearing them spoken aloud", "Doing a physical activity associated with them"], "q1")
-    answers['q2'] = render_radio_question(2, "When assembling a new toy, they are most likely to...",
-        ["Look carefully at the diagrams in the manual", "Ask someone to read the instructions to them", "Ignore the instructions and figure it out by handling the pieces"], "q2")
-    answers['q3'] = render_radio_question(3, "Express themselves and their ideas through...",
-        ["Drawing, doodling, or making visual aids", "Talking, telling stories, or singing songs", "Gesturing, acting things out, or building models"], "q3")
-    answers['q4'] = render_radio_question(4, "When spelling a new word, they often...",
-        ["Try to visualize what the word looks like", "Sound out the letters phonetically", "Write it down or trace the letters with their finger"], "q4")
-    answers['q5'] = render_radio_question(5, "Most distracted in classroom by...",
-        ["Messy or cluttered visual surroundings", "Noises and other people talking", "Having to sit still for long periods"], "q5")
-    answers['q6'] = render_radio_question(6, "Enjoy books that have...",
-        ["Lots of detailed illustrations or photographs", "A captivating narrator or read aloud with expression", "Interactive elements like flaps or textures to feel"], "q6")
-    
-    st.markdown("---")
-    st.subheader("🎯 Dimension 2: Developmental Orientation Profile")
-    answers['q7'] = render_radio_question(7, "When faced with a group project, my child organizes the plan and makes sure everyone knows their role.",
-        ["Very often", "Sometimes", "Rarely"], "q7")
-    answers['q8'] = render_radio_question(8, "Comes up with imaginative and original ideas for the project.",
-        ["Very often", "Sometimes", "Rarely"], "q8")
-    answers['q9'] = render_radio_question(9, "Focuses on making sure everyone feels included and is working together happily.",
-        ["Very often", "Sometimes", "Rarely"], "q9")
-    answers['q10'] = render_radio_question(10, "Is eager to start building or making the physical parts of the project.",
-        ["Very often", "Sometimes", "Rarely"], "q10")
-    answers['q11'] = render_radio_question(11, "Enjoys improving systems or processes to make work better.",
-        ["Very often", "Sometimes", "Rarely"], "q11")
-    answers['q12'] = render_radio_question(12, "Would rather invent a new game than play an existing one by the rules.",
-        ["Very often", "Sometimes", "Rarely"], "q12")
-    
-    st.markdown("---")
-    st.subheader("🧠 Dimension 3: Cognitive Strengths")
-    answers['q13'] = render_radio_question(13, "My child shows a natural talent or passion for solving logic puzzles or asking 'why' questions.",
-        ["Describes my child well", "Describes my child somewhat", "Does not describe my child"], "q13")
-    answers['q14'] = render_radio_question(14, "Reading, writing stories, or has a large vocabulary for their age.",
-        ["Describes my child well", "Describes my child somewhat", "Does not describe my child"], "q14")
-    answers['q15'] = render_radio_question(15, "Recognizing melodies, has a good sense of rhythm, or drawn to musical instruments.",
-        ["Describes my child well", "Describes my child somewhat", "Does not describe my child"], "q15")
-    answers['q16'] = render_radio_question(16, "Navigating new places, reading maps, or enjoys activities like drawing, painting, or sculpting.",
-        ["Describes my child well", "Describes my child somewhat", "Does not describe my child"], "q16")
-    answers['q17'] = render_radio_question(17, "Understanding other people's feelings and is good at cooperating in a group.",
-        ["Describes my child well", "Describes my child somewhat", "Does not describe my child"], "q17")
-    answers['q18'] = render_radio_question(18, "Being in nature, caring for animals, or noticing details in the natural world.",
-        ["Describes my child well", "Describes my child somewhat", "Does not describe my child"], "q18")
-    
-    st.markdown("---")
-    st.subheader("💝 Dimension 4: Social-Emotional Profile")
-    answers['q19'] = render_radio_question(19, "Able to calmly express their feelings, even when upset.",
-        ["Usually", "Sometimes", "Rarely"], "q19")
-    answers['q20'] = render_radio_question(20, "Prefers playing with one or two close friends rather than a large group.",
-        ["Usually", "Sometimes", "Rarely"], "q20")
-    answers['q21'] = render_radio_question(21, "Easily picks up on the moods and emotions of people around them.",
-        ["Usually", "Sometimes", "Rarely"], "q21")
-    answers['q22'] = render_radio_question(22, "Can bounce back from disappointments or setbacks in a reasonable amount of time.",
-        ["Usually", "Sometimes", "Rarely"], "q22")
-    answers['q23'] = render_radio_question(23, "Comfortable starting conversations with new children or joining a group already at play.",
-        ["Usually", "Sometimes", "Rarely"], "q23")
-    answers['q24'] = render_radio_question(24, "Will stand up for others or try to mediate when there is conflict between friends.",
-        ["Usually", "Sometimes", "Rarely"], "q24")
-    
-    st.markdown("---")
-    st.subheader("✝️ Dimension 5: Biblical Identity Markers")
-    answers['q25'] = render_radio_question(25, "Praised for their unique ideas and creative spirit (Created).",
-        ["Strongly agree", "Agree", "Disagree"], "q25")
-    answers['q26'] = render_radio_question(26, "Given a special role or purpose that helps others (Called).",
-        ["Strongly agree", "Agree", "Disagree"], "q26")
-    answers['q27'] = render_radio_question(27, "Recognized for a specific skill or talent they have developed (Capable).",
-        ["Strongly agree", "Agree", "Disagree"], "q27")
-    answers['q28'] = render_radio_question(28, "Feeling like a valued member of family, team, or church group (Connected).",
-        ["Strongly agree", "Agree", "Disagree"], "q28")
-    answers['q29'] = render_radio_question(29, "Encouraged to use personal gifts to bless someone else (Called/Capable).",
-        ["Strongly agree", "Agree", "Disagree"], "q29")
-    answers['q30'] = render_radio_question(30, "Reminded that they are loved unconditionally (Created/Connected).",
-        ["Strongly agree", "Agree", "Disagree"], "q30")
-    
-    st.markdown("---")
-    submitted = st.form_submit_button("🚀 Generate Professional PDF Report", use_container_width=True)
+def read_classroom_csv(uploaded_file, max_children: int = CLASSROOM_MAX_CHILDREN) -> List[Dict]:
+    """Parse an uploaded CSV with one row per child and columns q1-q30 (plus optional name).
 
-# ---------------- Process Submission ----------------
-if submitted:
-    if not all(answers.values()):
-        st.error("⚠️ Please answer all 30 questions before generating the report.")
-    elif not st.session_state.openai_api_key:
-        st.error("⚠️ Please enter your OpenAI API key in the sidebar.")
-    else:
-        with st.spinner("🤖 Generating comprehensive AI analysis and formatting professional PDF report... This may take 30-60 seconds."):
-            try:
-                # Generate AI analysis
-                client = OpenAI(api_key=st.session_state.openai_api_key)
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                
-                user_responses = "\n".join([f"{k}: {v}" for k, v in answers.items()])
-                
-                system_prompt = """You are Dr. Emily Richardson, a renowned child development specialist with 20+ years of experience in educational psychology, learning theory, and faith-based education.
+    Every answer must match one of its question's options, ignoring case and
+    surrounding spaces; answers are rewritten to the catalog text so scoring
+    and the prompt see exactly what the single-child form would produce.
+    """
+    reader = csv.DictReader(StringIO(uploaded_file.getvalue().decode('utf-8-sig')))
+    missing = [k for k in _ANSWER_KEYS if k not in (reader.fieldnames or ())]
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+    children = [row for row in reader if any((row.get(k) or '').strip() for k in _ANSWER_KEYS)]
+    if not children:
+        raise ValueError("CSV contains no answer rows")
+    if len(children) > max_children:
+        raise ValueError(f"Classroom mode supports up to {max_children} children per upload")
+    
+    problems = []
+    for i, child in enumerate(children, 1):
+        unmatched = []
+        for k in _ANSWER_KEYS:
+            option = _CANONICAL_OPTIONS[k].get((child.get(k) or '').strip().casefold())
+            if option is None:
+                unmatched.append(k)
+            else:
+                child[k] = option
+        if unmatched:
+            problems.append(f"Child {i} ({', '.join(unmatched)})")
+    if problems:
+        more = f" and {len(problems) - 5} more" if len(problems) > 5 else ""
+        raise ValueError(
+            "Some answers don't match the assessment options: "
+            + "; ".join(problems[:5]) + more
+        )
+    return children
 
-Create a comprehensive, warm, and insightful learning profile analysis."""
+def classroom_names(children: List[Dict]) -> List[str]:
+    """Name per CSV row, empty when the row has none."""
+    return [(child.get('name') or '').strip() for child in children]
 
-                user_prompt = f"""Analyze these assessment responses and create a detailed learning profile.
+def child_label(i: int, name: str) -> str:
+    """"Child N: Name", or just "Child N" for an unnamed row."""
+    return f"Child {i}: {name}" if name else f"Child {i}"
 
-RESPONSES:
-{user_responses}
+def classroom_answers(child: Dict) -> Dict:
+    """One CSV row as an answers dict covering every question key."""
+    return {k: (child.get(k) or '').strip() for k in _ANSWER_KEYS}
 
-Provide analysis with these sections (use ## for section headers):
+def format_child_profiles(names: Sequence[str], analyses: Mapping[int, str]) -> str:
+    """Join per-child analyses (keyed by 1-based row number) into one markdown document."""
+    sections = []
+    for i, name in enumerate(names, 1):
+        analysis = analyses.get(i, "_No profile was returned for this child._")
+        sections.append(f"# {child_label(i, name)}\n\n{analysis}")
+    return "\n\n---\n\n".join(sections)
 
-## Executive Summary
-2-3 sentences capturing the essence of this child's profile.
+def build_classroom_prompt(children: List[Dict]) -> str:
+    """Build a single user prompt holding every child's responses after the static instructions."""
+    blocks = []
+    for i, (child, name) in enumerate(zip(children, classroom_names(children)), 1):
+        label = f"CHILD {i}: {name}" if name else f"CHILD {i}"
+        blocks.append(f"--- {label} ---\n{format_responses(classroom_answers(child))}")
+    return CLASSROOM_INSTRUCTIONS + "\n\n" + "\n\n".join(blocks)
 
-## Primary Learning Style
-Identify Visual/Auditory/Kinesthetic with evidence and percentages.
+def build_messages(answers: Dict, max_tokens: int, scores: Optional[Scores] = None) -> List[Dict]:
+    """Chat messages for one child's full analysis: static prefix first, responses and scores last.
 
-## Cognitive Strengths Profile
-Top 2-3 multiple intelligences with specific examples.
+    The requested length is sized to fit within max_tokens, the request's output limit.
+    """
+    if scores is None:
+        scores = calculate_dimension_scores(answers)
+    max_words = int(max_tokens * ANALYSIS_WORDS_PER_TOKEN) // 50 * 50
+    # Counted scores trail the responses, so the model cites them rather than re-deriving them
+    user_prompt = USER_PROMPT_TEMPLATE.format(
+        responses=format_responses(answers),
+        s=scores,
+        min_words=max_words * 3 // 4,
+        max_words=max_words
+    )
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
 
-## Developmental Orientation
-Leadership, creativity, collaboration, problem-solving approach.
+def model_request_kwargs(model: str, max_tokens: int) -> Dict:
+    """Model-specific chat.completions.create kwargs, including the output token limit."""
+    return {MODEL_TOKEN_PARAM[model]: max_tokens, **MODEL_KWARGS[model]}
 
-## Social-Emotional Landscape
-Emotional regulation, social preferences, empathy, resilience.
+def analysis_request_kwargs(model: str, max_tokens: int) -> Dict:
+    """Request kwargs for a full single-child analysis, including the STOP sequence."""
+    return {
+        **model_request_kwargs(model, max_tokens),
+        "stop": list(ANALYSIS_STOP)
+    }
 
-## Biblical Identity & Purpose
-How they embody Created, Called, Capable, Connected.
+def submit_batch(client, children: List[Dict], model: str, max_tokens: int) -> str:
+    """Queue one full analysis per child with the Batch API and return the batch id."""
+    lines = []
+    for i, child in enumerate(children, 1):
+        lines.append(json.dumps({
+            "custom_id": f"child-{i}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": model,
+                "messages": build_messages(classroom_answers(child), max_tokens),
+                **analysis_request_kwargs(model, max_tokens)
+            },
+        }))
+    batch_file = client.files.create(
+        file=("classroom_batch.jsonl", "\n".join(lines).encode("utf-8")),
+        purpose="batch"
+    )
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    return batch.id
 
-## Personalized Recommendations
+def read_batch_results(client, batch, names: Sequence[str]) -> str:
+    """Collect a completed batch's analyses into one markdown document, in upload order."""
+    analyses = {}
+    if batch.output_file_id:
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            row = json.loads(line)
+            response = row.get("response") or {}
+            if response.get("status_code") == 200:
+                child = int(row["custom_id"].removeprefix("child-"))
+                analyses[child] = response["body"]["choices"][0]["message"]["content"]
+    return format_child_profiles(names, analyses)
 
-### For Parents (5-6 strategies)
-Specific daily practices, environment setup, communication approaches.
+def analyze_child(client, answers: Dict, model: str, max_tokens: int) -> str:
+    """Run one child's full analysis without streaming; safe to call from worker threads."""
+    response = client.chat.completions.create(
+        model=model,
+        messages=build_messages(answers, max_tokens),
+        **analysis_request_kwargs(model, max_tokens)
+    )
+    return response.choices[0].message.content
 
-### For Educators (3-4 strategies)
-Classroom accommodations, assessment methods, group work.
+@st.cache_resource(show_spinner=False)
+def _analysis_executor() -> ThreadPoolExecutor:
+    """Process-wide pool for concurrent classroom analyses, capped at PARALLEL_REQUESTS."""
+    return ThreadPoolExecutor(max_workers=PARALLEL_REQUESTS, thread_name_prefix="analysis")
 
-### Potential Challenges & Solutions (2-3)
-Areas of struggle with proactive solutions.
+@st.cache_resource(show_spinner=False)
+def get_openai_client(api_key_hash: str, _api_key: str) -> "OpenAI":
+    """Return a pooled OpenAI client per API key, reusing its HTTP/2 connections across reruns.
 
-## Closing Affirmation
-Powerful, personalized affirmation of this child's value and potential.
+    Only api_key_hash is part of the cache key; the leading underscore keeps
+    Streamlit from hashing the secret itself.
+    """
+    # Imported here so reruns that never call the API skip loading openai/httpx
+    import httpx
+    from openai import OpenAI
+    # Idle connections stay warm for a minute, enough for every parallel classroom
+    # worker; connects fail fast while slow generations keep a long read timeout.
+    # OPENAI_BASE_URL, if set, is honored by the SDK for a closer regional endpoint.
+    return OpenAI(
+        api_key=_api_key,
+        max_retries=API_MAX_RETRIES,
+        http_client=httpx.Client(
+            http2=True,
+            timeout=httpx.Timeout(120.0, connect=5.0),
+            limits=httpx.Limits(max_keepalive_connections=PARALLEL_REQUESTS, keepalive_expiry=60.0)
+        )
+    )
 
-Use warm, encouraging language. Be specific based on actual responses. Length: 900-1200 words."""
-
-                response = client.chat.completions.create(
-                    model=model_choice,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    max_tokens=analysis_depth,
-                    temperature=0.7
-                )
-                
-                analysis = response.choices[0].message.content
+@st.cache_resource(show_spinner=False)
+def _analysis_store() -> Tuple["OrderedDict[Tuple, Tuple[float, str]]", threading.Lock]:
+    """Process-wide store of generated analyses, shared by all sessions."""
+    return OrderedDict(), threading.Lock()
+
+@st.cache_resource(show_spinner=False)
+def _analysis_db() -> Tuple[sqlite3.Connection, threading.Lock]:
+    """Process-wide connection to the on-disk analysis table."""
+    conn = sqlite3.connect(ANALYSIS_DB_PATH, check_same_thread=False)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS analyses "
+        "(key TEXT PRIMARY KEY, created REAL NOT NULL, analysis TEXT NOT NULL)"
+    )
+    conn.commit()
+    return conn, threading.Lock()
+
+def _analysis_db_key(key: Tuple) -> str:
+    """SHA-256 of an analysis key, used as the on-disk row id."""
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+def report_cache_key(answers: Dict, model: str, analysis_depth: int) -> str:
+    """Stable digest of everything that determines a report's analysis."""
+    payload = json.dumps(answers, sort_keys=True) + model + str(analysis_depth)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+def get_cached_analysis(key: Tuple) -> Optional[str]:
+    """Return a stored analysis for key, checking memory first and then the on-disk table."""
+    now = time.time()
+    store, lock = _analysis_store()
+    with lock:
+        entry = store.get(key)
+        if entry is not None:
+            if now - entry[0] < ANALYSIS_DB_TTL:
+                store.move_to_end(key)
+                return entry[1]
+            del store[key]
+    
+    # A broken or read-only cache file only costs the disk hit, never the report
+    try:
+        conn, db_lock = _analysis_db()
+        with db_lock:
+            row = conn.execute(
+                "SELECT created, analysis FROM analyses WHERE key = ? AND created > ?",
+                (_analysis_db_key(key), now - ANALYSIS_DB_TTL)
+            ).fetchone()
+    except sqlite3.Error:
+        return None
+    if row is None:
+        return None
+    # Promoted with the row's own creation time, so it still expires on schedule
+    _remember_analysis(key, row[1], row[0])
+    return row[1]
+
+def _remember_analysis(key: Tuple, analysis: str, created: float):
+    """Put an analysis in the in-memory store, evicting the oldest entries beyond ANALYSIS_CACHE_SIZE."""
+    store, lock = _analysis_store()
+    with lock:
+        store[key] = (created, analysis)
+        store.move_to_end(key)
+        while len(store) > ANALYSIS_CACHE_SIZE:
+            store.popitem(last=False)
+
+def store_analysis(key: Tuple, analysis: str):
+    """Remember an analysis in memory and on disk, pruning expired rows."""
+    # Never persist an empty analysis; a disk row would serve it for ANALYSIS_DB_TTL
+    if not analysis:
+        return
+    now = time.time()
+    _remember_analysis(key, analysis, now)
+    try:
+        conn, db_lock = _analysis_db()
+        with db_lock, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analyses (key, created, analysis) VALUES (?, ?, ?)",
+                (_analysis_db_key(key), now, analysis)
+            )
+            conn.execute("DELETE FROM analyses WHERE created <= ?", (now - ANALYSIS_DB_TTL,))
+    except sqlite3.Error:
+        pass
+
+def stream_text(stream, stream_info: Dict):
+    """Yield text deltas from an OpenAI chat stream, recording usage and timings in stream_info.
+
+    Callers set stream_info['t_start'] before issuing the request; this adds
+    't_first' (first text delta), 't_end', 'chars' and 'finish_reason'.
+    """
+    chars = 0
+    for chunk in stream:
+        if chunk.usage is not None:
+            stream_info['usage'] = chunk.usage
+        if chunk.choices:
+            if chunk.choices[0].finish_reason:
+                stream_info['finish_reason'] = chunk.choices[0].finish_reason
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if not chars:
+                    stream_info['t_first'] = time.perf_counter()
+                chars += len(delta)
+                yield delta
+    stream_info['t_end'] = time.perf_counter()
+    stream_info['chars'] = chars
+
+def render_stream_metrics(stream_info: Dict):
+    """Show time-to-first-token, throughput and prompt-cache hits for a finished stream."""
+    if 't_first' not in stream_info:
+        return
+    ttft = stream_info['t_first'] - stream_info['t_start']
+    generation_time = max(stream_info['t_end'] - stream_info['t_first'], 1e-6)
+    usage = stream_info.get('usage')
+    if usage is not None:
+        completion_tokens = usage.completion_tokens
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached_tokens = f"{getattr(details, 'cached_tokens', 0) or 0} / {usage.prompt_tokens}"
+    else:
+        # No usage chunk: estimate ~4 characters per token
+        completion_tokens = stream_info['chars'] / 4
+        cached_tokens = "n/a"
+    
+    with st.expander("📊 Generation Metrics"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Time to First Token", f"{ttft * 1000:.0f} ms")
+        with col2:
+            st.metric("Tokens/s", f"{completion_tokens / generation_time:.1f}")
+        with col3:
+            st.metric("Cached Prompt Tokens", cached_tokens)
+
+def render_learning_scores(scores: Scores):
+    """Show the three learning style counts side by side."""
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Visual Learning", f"{scores.visual}/6")
+    with col2:
+        st.metric("Auditory Learning", f"{scores.auditory}/6")
+    with col3:
+        st.metric("Kinesthetic Learning", f"{scores.kinesthetic}/6")
+
+def render_report_download(pdf_bytes: bytes, file_name: str):
+    """Success note and download button for a finished PDF report."""
+    st.success("✅ Professional PDF Report Generated!")
+    
+    st.download_button(
+        label="📥 Download Professional PDF Report",
+        data=pdf_bytes,
+        file_name=file_name,
+        mime="application/pdf",
+        use_container_width=True
+    )
+
+# ---------------- Assessment Form ----------------
+with st.form("full_assessment"):
+    answers = {}
+    
+    for section, heading in enumerate(SECTION_HEADINGS):
+        # One keyed, bordered container per dimension gives the frontend a stable
+        # subtree to diff, and its border replaces the markdown divider
+        with st.container(border=True, key=f"dimension_{section + 1}"):
+            st.markdown(f"### {heading}")
+            start = section * QUESTIONS_PER_SECTION
+            section_questions = QUESTIONS[start:start + QUESTIONS_PER_SECTION]
+            if len({q.options for q in section_questions}) == 1:
+                # Shared answer scale: one grid widget instead of six radios
+                answers.update(render_scale_grid(start + 1, section_questions, f"dim_{section + 1}"))
+            else:
+                for q in section_questions:
+                    answers[q.key] = st.radio(q.label, q.options, key=q.key)
+    
+    st.markdown("---")
+    submitted = st.form_submit_button("🚀 Generate Professional PDF Report", use_container_width=True)
+
+# ---------------- Process Submission ----------------
+if submitted:
+    if len(answers) != len(QUESTIONS) or None in answers.values():
+        st.error("⚠️ Please answer all 30 questions before generating the report.")
+    elif not st.session_state.openai_api_key:
+        st.error("⚠️ Please enter your OpenAI API key in the sidebar.")
+    else:
+        with st.spinner("🤖 Generating comprehensive AI analysis and formatting professional PDF report... This may take 30-60 seconds."):
+            try:
+                # Reuse this session's report for identical answers, skipping the API and PDF build
+                report_key = report_cache_key(answers, model_choice, analysis_depth)
+                scores = calculate_dimension_scores(answers)
+                cached_report = st.session_state.pdf_cache.get(report_key)
+                stream_info = {}
+                if cached_report is not None:
+                    st.session_state.pdf_cache.move_to_end(report_key)
+                    analysis, pdf_bytes, file_name = cached_report
+                    with st.expander("📖 Preview Analysis Content", expanded=True):
+                        st.markdown(analysis)
+                    st.caption("♻️ Reused the report generated earlier in this session for these exact answers.")
+                else:
+                    # One clock read for both the report's display time and the file name
+                    now = datetime.now()
+                    timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+                    file_name = f"KidVentures_Learning_Profile_{now:%Y-%m-%d_%H-%M-%S}.pdf"
+                    analysis_key = (
+                        tuple(answers[k].strip() for k in _ANSWER_KEYS),
+                        model_choice,
+                        analysis_depth,
+                        st.session_state.openai_api_key_hash
+                    )
+                    
+                    # Prepare the analysis-independent PDF pages while the AI response streams
+                    assets = report_assets()
+                    frame_future = _report_executor().submit(
+                        build_report_frame, answers, timestamp, model_choice, assets
+                    )
+                    
+                    # Generate AI analysis, unless these exact answers were analyzed recently
+                    analysis = get_cached_analysis(analysis_key)
+                    if analysis is None:
+                        client = get_openai_client(
+                            st.session_state.openai_api_key_hash,
+                            st.session_state.openai_api_key
+                        )
+                        stream_info['t_start'] = time.perf_counter()
+                        stream = client.chat.completions.create(
+                            model=model_choice,
+                            messages=build_messages(answers, analysis_depth, scores),
+                            **analysis_request_kwargs(model_choice, analysis_depth),
+                            stream=True,
+                            stream_options={"include_usage": True}
+                        )
+                        
+                        # Render tokens as they arrive; write_stream returns the full text
+                        with st.expander("📖 Preview Analysis Content", expanded=True):
+                            analysis = st.write_stream(stream_text(stream, stream_info))
+                        # Only complete analyses are reused; an empty or cut-off one
+                        # (content filter, token limit) is regenerated next time
+                        if analysis and stream_info.get('finish_reason') == "stop":
+                            store_analysis(analysis_key, analysis)
+                    else:
+                        with st.expander("📖 Preview Analysis Content", expanded=True):
+                            st.markdown(analysis)
+                        st.caption("♻️ Reused the analysis generated earlier for these exact answers.")
+                    
+                    # Lay out the PDF on a worker while the scores and metrics below render
+                    pdf_future = _report_executor().submit(
+                        generate_pdf_report, analysis, answers, timestamp, model_choice,
+                        frame=frame_future.result(), assets=assets
+                    )
+                    pdf_bytes = None
                 
-                # Generate PDF
-                pdf_buffer = generate_pdf_report(analysis, answers, timestamp, model_choice)
+                # Filled once the PDF is ready, but shown above the scores
+                report_slot = st.container()
                 
-                st.success("✅ Professional PDF Report Generated!")
+                render_learning_scores(scores)
                 
-                # Display download button
-                st.download_button(
-                    label="📥 Download Professional PDF Report",
-                    data=pdf_buffer,
-                    file_name=f"KidVentures_Learning_Profile_{timestamp.replace(':', '-').replace(' ', '_')}.pdf",
-                    mime="application/pdf",
-                    use_container_width=True
-                )
+                render_stream_metrics(stream_info)
                 
-                # Preview
-                with st.expander("📖 Preview Analysis Content"):
-                    st.markdown(analysis)
+                if pdf_bytes is None:
+                    # Keep immutable bytes for the button and cache; release the buffer right away
+                    with pdf_future.result() as pdf_buffer:
+                        pdf_bytes = pdf_buffer.getvalue()
+                    st.session_state.pdf_cache[report_key] = (analysis, pdf_bytes, file_name)
+                    while len(st.session_state.pdf_cache) > PDF_CACHE_SIZE:
+                        st.session_state.pdf_cache.popitem(last=False)
                 
-                # Scores
-                scores = calculate_dimension_scores(answers)
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Visual Learning", f"{scores['visual']}/6")
-                with col2:
-                    st.metric("Auditory Learning", f"{scores['auditory']}/6")
-                with col3:
-                    st.metric("Kinesthetic Learning", f"{scores['kinesthetic']}/6")
+                with report_slot:
+                    render_report_download(pdf_bytes, file_name)
+                st.session_state.last_report = (report_key, scores)
                 
             except Exception as e:
                 st.error(f"❌ Error: {str(e)}")
                 st.info("Please check your API key and try again.")
+elif 'last_report' in st.session_state:
+    # Any other interaction (including the download itself) reruns the script;
+    # redraw the latest report from this session's cache instead of dropping it
+    last_key, last_scores = st.session_state.last_report
+    last_report = st.session_state.pdf_cache.get(last_key)
+    if last_report is not None:
+        last_analysis, last_pdf, last_file_name = last_report
+        with st.expander("📖 Preview Analysis Content"):
+            st.markdown(last_analysis)
+        render_report_download(last_pdf, last_file_name)
+        render_learning_scores(last_scores)
+
+# ---------------- Classroom Mode ----------------
+st.markdown("---")
+with st.expander("👩‍🏫 Classroom Mode: Analyze Several Children at Once"):
+    st.markdown(f"""
+    Upload a CSV with one row per child, columns `q1` to `q30` holding the answer text, and an
+    optional `name` column. Up to {CLASSROOM_MAX_CHILDREN} children are analyzed in a single request.
+    
+    For full individual profiles, run them now as parallel requests (up to {PARALLEL_MAX_CHILDREN}
+    children), or queue a batch: up to {BATCH_MAX_CHILDREN} children at half the API cost, ready
+    within 24 hours.
+    """)
+    classroom_file = st.file_uploader("Assessment CSV", type="csv", key="classroom_csv")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        classroom_submitted = st.button(
+            "🚀 Generate Group Profiles",
+            disabled=classroom_file is None,
+            use_container_width=True
+        )
+    with col2:
+        parallel_submitted = st.button(
+            "⚡ Full Profiles Now",
+            disabled=classroom_file is None,
+            use_container_width=True
+        )
+    with col3:
+        batch_submitted = st.button(
+            "🌙 Queue Full Profiles as Batch",
+            disabled=classroom_file is None,
+            use_container_width=True
+        )
+
+if classroom_submitted:
+    if not st.session_state.openai_api_key:
+        st.error("⚠️ Please enter your OpenAI API key in the sidebar.")
+    else:
+        try:
+            children = read_classroom_csv(classroom_file)
+            client = get_openai_client(
+                st.session_state.openai_api_key_hash,
+                st.session_state.openai_api_key
+            )
+            stream_info = {'t_start': time.perf_counter()}
+            stream = client.chat.completions.create(
+                model=model_choice,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": build_classroom_prompt(children)}
+                ],
+                **model_request_kwargs(model_choice, CLASSROOM_TOKENS_PER_CHILD * len(children)),
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            
+            with st.spinner(f"🤖 Generating {len(children)} learning profiles..."):
+                group_analysis = st.write_stream(stream_text(stream, stream_info))
+            render_stream_metrics(stream_info)
+            
+            st.download_button(
+                label="📥 Download Group Profiles",
+                data=group_analysis.encode("utf-8"),
+                file_name=f"KidVentures_Group_Profiles_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.md",
+                mime="text/markdown",
+                use_container_width=True
+            )
+        
+        except Exception as e:
+            st.error(f"❌ Error: {str(e)}")
+            st.info("Please check your CSV file and API key and try again.")
+
+if parallel_submitted:
+    if not st.session_state.openai_api_key:
+        st.error("⚠️ Please enter your OpenAI API key in the sidebar.")
+    else:
+        try:
+            children = read_classroom_csv(classroom_file, PARALLEL_MAX_CHILDREN)
+            import httpx
+            client = get_openai_client(
+                st.session_state.openai_api_key_hash,
+                st.session_state.openai_api_key
+            ).with_options(
+                max_retries=PARALLEL_MAX_RETRIES,
+                timeout=httpx.Timeout(PARALLEL_READ_TIMEOUT, connect=5.0)
+            )
+            executor = _analysis_executor()
+            futures = {
+                executor.submit(analyze_child, client, classroom_answers(child), model_choice, analysis_depth): i
+                for i, child in enumerate(children, 1)
+            }
+            
+            # Collect in completion order; one child's failure doesn't discard the rest
+            analyses = {}
+            progress = st.progress(0.0, text=f"🤖 Generating {len(children)} full profiles...")
+            for future in as_completed(futures):
+                try:
+                    analyses[futures[future]] = future.result()
+                except Exception as e:
+                    analyses[futures[future]] = f"_Analysis failed: {e}_"
+                progress.progress(len(analyses) / len(futures), text=f"🤖 {len(analyses)}/{len(futures)} profiles ready")
+            
+            st.download_button(
+                label="📥 Download Full Profiles",
+                data=format_child_profiles(classroom_names(children), analyses).encode("utf-8"),
+                file_name=f"KidVentures_Full_Profiles_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.md",
+                mime="text/markdown",
+                use_container_width=True
+            )
+        
+        except Exception as e:
+            st.error(f"❌ Error: {str(e)}")
+            st.info("Please check your CSV file and API key and try again.")
+
+if batch_submitted:
+    if not st.session_state.openai_api_key:
+        st.error("⚠️ Please enter your OpenAI API key in the sidebar.")
+    else:
+        try:
+            children = read_classroom_csv(classroom_file, BATCH_MAX_CHILDREN)
+            client = get_openai_client(
+                st.session_state.openai_api_key_hash,
+                st.session_state.openai_api_key
+            )
+            # Only the id and names are kept; results are fetched when the batch completes
+            st.session_state.classroom_batch = {
+                'id': submit_batch(client, children, model_choice, analysis_depth),
+                'names': classroom_names(children),
+                'result': None,
+            }
+        except Exception as e:
+            st.error(f"❌ Error: {str(e)}")
+            st.info("Please check your CSV file and API key and try again.")
+
+batch_job = st.session_state.get('classroom_batch')
+if batch_job is not None:
+    st.markdown(f"#### 🌙 Batch `{batch_job['id']}` ({len(batch_job['names'])} children)")
+    if batch_job['result'] is None and st.button("🔄 Check Batch Status", use_container_width=True):
+        try:
+            client = get_openai_client(
+                st.session_state.openai_api_key_hash,
+                st.session_state.openai_api_key
+            )
+            batch = client.batches.retrieve(batch_job['id'])
+            counts = batch.request_counts
+            progress = f" ({counts.completed}/{counts.total} done, {counts.failed} failed)" if counts else ""
+            if batch.status == "completed":
+                batch_job['result'] = read_batch_results(client, batch, batch_job['names'])
+            elif batch.status in ("failed", "expired", "cancelled"):
+                st.error(f"❌ Batch {batch.status}{progress}. Please queue it again.")
+                del st.session_state.classroom_batch
+            else:
+                st.info(f"⏳ Batch {batch.status}{progress}. Check back later.")
+        except Exception as e:
+            st.error(f"❌ Error: {str(e)}")
+            st.info("Please check your API key and try again.")
+    if batch_job['result'] is not None:
+        st.download_button(
+            label="📥 Download Batch Profiles",
+            data=batch_job['result'].encode("utf-8"),
+            file_name=f"KidVentures_Batch_Profiles_{batch_job['id']}.md",
+            mime="text/markdown",
+            use_container_width=True
+        )
 
 st.markdown("---")
 st.caption("© 2024 KidVentures Learning | Powered by OpenAI | Professional PDF Reports")